@@ -1,115 +1,78 @@
 import argparse
 
-import ezdxf
-import matplotlib.pyplot as plt
-import numpy as np
-from ezdxf import zoom
-from ezdxf.enums import TextEntityAlignment
-from matplotlib import cm
-from scipy.interpolate import griddata
+from surf_grid import core
+
+
+def process(filename, layer, typ):
+    print("Reading dxf...")
+
+    doc = core.readfile(filename)
+    coords = core.read_coords(doc, layer, typ)
+
+    print("Interpolation...")
+
+    grid_x, grid_y, Z = core.interpolate(coords)
+
+    print("Adding to dxf...")
+
+    squares, icoords = core.build_grid(grid_x, grid_y, Z)
+    core.emit_dxf_grid(doc, grid_x, grid_y, icoords)
+
+    print("Saving dxf...")
+
+    core.save_dxf(doc, filename[:-4] + "_output.dxf")
+
+    print("Saving csv...")
+
+    core.save_csv(squares, filename[:-4] + "_output.csv")
+    core.save_npz(squares, icoords, filename[:-4] + "_output.npz", layer, typ)
+
+    return icoords
+
+
+def max_points(value):
+    value = int(value)
+    if value < 3:
+        raise argparse.ArgumentTypeError("must be at least 3")
+    return value
+
 
 parser = argparse.ArgumentParser(description="Plot surface")
 parser.add_argument("filename", help="dxf file")
 parser.add_argument("--layer", default=0, help="dxf layer")
 parser.add_argument("--typ", default="CIRCLE", help="CIRCLE or POINT")
+parser.add_argument(
+    "--no-show",
+    action="store_true",
+    help="save the surface plot as png instead of showing it",
+)
+parser.add_argument(
+    "--max-points",
+    type=max_points,
+    default=100_000,
+    help="maximum number of points used for the surface plot",
+)
+parser.add_argument(
+    "--from-cache",
+    action="store_true",
+    help="plot from the npz saved by a previous run if it is up to date",
+)
 args = parser.parse_args()
 
-print("Reading dxf...")
-
-doc = ezdxf.readfile(args.filename)
-
-doc.header["$PDMODE"] = 32
-doc.header["$PDSIZE"] = 0.25
-
-doc.styles.new("myStandard", dxfattribs={"font": "Arial.ttf"})
-doc.layers.new(name="PY")
-
-msp = doc.modelspace()
-coords = []
-
-match args.typ:
-    case "CIRCLE":
-        pts = msp.query(f'CIRCLE[layer=="{args.layer}"]')
-        for p in pts:
-            coords.append(p.dxf.center)
-    case "POINT":
-        pts = msp.query(f'POINT[layer=="{args.layer}"]')
-        for p in pts:
-            coords.append(p.dxf.location)
-
-print("Interpolation...")
-
-coords = np.array(coords)
-points = coords[:, :2]
-values = coords[:, 2]
-
-min_x = np.min(coords[:, 0])
-max_x = np.max(coords[:, 0])
-min_y = np.min(coords[:, 1])
-max_y = np.max(coords[:, 1])
-
-delta_x = max_x - min_x
-delta_y = max_y - min_y
-
-step = 2
-delta_x = np.around(delta_x / step)
-delta_y = np.around(delta_y / step)
-
-grid_x = np.arange(0, delta_x) * step + min_x
-grid_y = np.arange(0, delta_y) * step + min_y
-
-X, Y = np.meshgrid(grid_x, grid_y)
-Z = griddata(points, values, (X, Y), method="linear")
-Z = Z.T
-
-print("Adding to dxf...")
-
-num = 0
-icoords = []
-squares = []
-
-for i, x in enumerate(grid_x):
-    for j, y in enumerate(grid_y):
-        num += 1
-        msp.add_text(
-            f"{num}",
-            height=0.25,
-            dxfattribs={"layer": "PY", "color": 4, "style": "myStandard"},
-        ).set_placement((x + step / 2, y + step / 2), align=TextEntityAlignment.CENTER)
-        z = Z[i, j]
-        try:
-            squares.append([num, Z[i, j], Z[i + 1, j], Z[i, j + 1], Z[i + 1, j + 1]])
-        except IndexError:
-            pass
-        if not np.isnan(z):
-            icoords.append((x, y, z))
-            msp.add_point((x, y, z), dxfattribs={"layer": "PY", "color": 6})
-
-print("Saving dxf...")
-
-zoom.extents(msp)
-doc.saveas(args.filename[:-4] + "_output.dxf")
-
-squares = np.array(squares)
-icoords = np.array(icoords)
-
-x = icoords[:, 0]
-y = icoords[:, 1]
-z = icoords[:, 2]
-
-print("Saving csv...")
-
-np.savetxt(
-    args.filename[:-4] + "_output.csv",
-    squares,
-    delimiter=";",
-    fmt=["%i", "%10.4f", "%10.4f", "%10.4f", "%10.4f"],
-    encoding="utf-8",
-)
+icoords = None
+if args.from_cache:
+    icoords = core.load_npz(
+        args.filename[:-4] + "_output.npz", args.filename, args.layer, args.typ
+    )
+
+if icoords is None:
+    icoords = process(args.filename, args.layer, args.typ)
+else:
+    print("Using cached grid...")
 
 print("Plotting surface...")
 
-fig = plt.figure()
-ax = fig.add_subplot(projection="3d")
-surf = ax.plot_trisurf(x, y, z, cmap=cm.terrain)
-plt.show()
+if args.no_show:
+    core.plot(icoords, args.filename[:-4] + "_output.png", args.max_points)
+else:
+    core.plot(icoords, max_points=args.max_points)
@@ -0,0 +1,26 @@
+import numpy as np
+from numba import njit, prange
+
+
+@njit(parallel=True, cache=True)
+def build_squares_and_mask(Z):
+    nx, ny = Z.shape
+    sx = max(nx - 1, 0)
+    sy = max(ny - 1, 0)
+    squares = np.empty((sx * sy, 5))
+    mask = np.empty((nx, ny), dtype=np.bool_)
+    for i in prange(nx):
+        for j in range(ny):
+            mask[i, j] = not np.isnan(Z[i, j])
+            if i < nx - 1 and j < ny - 1:
+                k = i * sy + j
+                squares[k, 0] = i * ny + j + 1
+                squares[k, 1] = Z[i, j]
+                squares[k, 2] = Z[i + 1, j]
+                squares[k, 3] = Z[i, j + 1]
+                squares[k, 4] = Z[i + 1, j + 1]
+    ix_valid, iy_valid = np.nonzero(mask)
+    z_valid = np.empty(len(ix_valid), dtype=Z.dtype)
+    for k in range(len(ix_valid)):
+        z_valid[k] = Z[ix_valid[k], iy_valid[k]]
+    return squares, ix_valid, iy_valid, z_valid
@@ -0,0 +1,262 @@
+import itertools
+import os
+
+import ezdxf
+import numpy as np
+from ezdxf import zoom
+from ezdxf.enums import TextEntityAlignment
+from ezdxf.filemanagement import dxf_file_info
+from ezdxf.lldxf.validator import is_binary_dxf_file, is_dxf_file
+from scipy.interpolate import griddata
+
+STEP = 2
+NUMBA_MIN_SIZE = 1_000_000
+
+
+def readfile(filename, buffering=1 << 20):
+    """Read a DXF document through a large read buffer."""
+    if is_binary_dxf_file(filename):
+        return ezdxf.readfile(filename)
+    if not is_dxf_file(filename):
+        raise IOError(f"File '{filename}' is not a DXF file.")
+    info = dxf_file_info(filename)
+    with open(
+        filename,
+        "rt",
+        buffering=buffering,
+        encoding=info.encoding,
+        errors="surrogateescape",
+    ) as fh:
+        doc = ezdxf.read(fh)
+    doc.filename = filename
+    return doc
+
+
+def read_coords(doc, layer=0, typ="CIRCLE"):
+    """Return xyz coordinates of CIRCLE centers or POINT locations on layer."""
+    msp = doc.modelspace()
+    coords = np.empty((0, 3))
+    layer = str(layer)
+
+    match typ:
+        case "CIRCLE":
+            pts = [e for e in msp.query("CIRCLE") if e.dxf.layer == layer]
+            coords = np.empty((len(pts), 3))
+            for k, p in enumerate(pts):
+                coords[k] = p.dxf.center
+        case "POINT":
+            pts = [e for e in msp.query("POINT") if e.dxf.layer == layer]
+            coords = np.empty((len(pts), 3))
+            for k, p in enumerate(pts):
+                coords[k] = p.dxf.location
+
+    return coords
+
+
+def _snap_to_grid(points, origin, step, tol=1e-3):
+    """Return grid indices of points filling a regular grid, otherwise None.
+
+    Every node of the bounding lattice must hold exactly one point, so
+    lattices with holes or a coarser spacing than step are left to griddata.
+    """
+    idx = (points - origin) / step
+    ij = np.round(idx)
+    if not np.all(np.abs(idx - ij) <= tol):
+        return None
+    ij = ij.astype(np.intp)
+    if len(ij) != np.prod(ij.max(axis=0) + 1):
+        return None
+    if len(np.unique(ij, axis=0)) != len(ij):
+        return None
+    return ij
+
+
+def _scatter_to_grid(ij, values, nx, ny):
+    """Return the nx by ny corner of the lattice holding values at nodes ij.
+
+    _snap_to_grid only accepts complete lattices anchored at the grid
+    origin with spacing step, so every grid node is a source node and no
+    interpolation is needed.
+    """
+    src = np.empty(tuple(ij.max(axis=0) + 1))
+    src[ij[:, 0], ij[:, 1]] = values
+    return src[:nx, :ny]
+
+
+def interpolate(coords, step=STEP):
+    """Interpolate coords onto a grid with spacing step.
+
+    Returns grid_x, grid_y and Z indexed as Z[i, j] -> (grid_x[i], grid_y[j]).
+    """
+    points = coords[:, :2]
+    values = coords[:, 2]
+
+    min_x, min_y = points.min(axis=0)
+    max_x, max_y = points.max(axis=0)
+
+    delta_x = max_x - min_x
+    delta_y = max_y - min_y
+
+    delta_x = np.around(delta_x / step)
+    delta_y = np.around(delta_y / step)
+
+    grid_x = np.arange(0, delta_x) * step + min_x
+    grid_y = np.arange(0, delta_y) * step + min_y
+
+    ij = _snap_to_grid(points, (min_x, min_y), step)
+    if ij is not None:
+        Z = _scatter_to_grid(ij, values, len(grid_x), len(grid_y))
+    else:
+        Z = griddata(
+            points, values, (grid_x[:, None], grid_y[None, :]), method="linear"
+        )
+
+    return grid_x, grid_y, Z
+
+
+def _build_squares_and_mask(Z):
+    """Return the squares table and indices/values of the valid grid nodes.
+
+    Grids of at least NUMBA_MIN_SIZE nodes use the compiled kernel from
+    surf_grid._numba when numba is installed; below that its import and
+    cache loading cost more than the NumPy version takes.
+    """
+    if Z.size >= NUMBA_MIN_SIZE:
+        try:
+            from surf_grid._numba import build_squares_and_mask
+        except ImportError:
+            pass
+        else:
+            return build_squares_and_mask(Z)
+
+    nx, ny = Z.shape
+    nums = np.arange(1, nx * ny + 1).reshape(nx, ny)
+    squares = np.stack(
+        [nums[:-1, :-1], Z[:-1, :-1], Z[1:, :-1], Z[:-1, 1:], Z[1:, 1:]], axis=-1
+    ).reshape(-1, 5)
+    mask = ~np.isnan(Z)
+    ix_valid, iy_valid = np.nonzero(mask)
+    return squares, ix_valid, iy_valid, Z[mask]
+
+
+def build_grid(grid_x, grid_y, Z):
+    """Return the squares table and xyz coordinates of the valid grid nodes.
+
+    Each row of squares holds the square number and the elevations of its
+    four corners.
+    """
+    squares, ix_valid, iy_valid, z_valid = _build_squares_and_mask(Z)
+    icoords = np.stack([grid_x[ix_valid], grid_y[iy_valid], z_valid], axis=1)
+    return squares, icoords
+
+
+def emit_dxf_grid(doc, grid_x, grid_y, icoords, step=STEP):
+    """Add square numbers and grid points to the PY layer of doc."""
+    doc.header["$PDMODE"] = 32
+    doc.header["$PDSIZE"] = 0.25
+
+    try:
+        doc.styles.new("myStandard", dxfattribs={"font": "Arial.ttf"})
+    except ezdxf.DXFTableEntryError:
+        pass
+    try:
+        doc.layers.new(name="PY")
+    except ezdxf.DXFTableEntryError:
+        pass
+
+    msp = doc.modelspace()
+    text_attrs = {"layer": "PY", "color": 4, "style": "myStandard"}
+    point_attrs = {"layer": "PY", "color": 6}
+    add_text = msp.add_text
+    add_point = msp.add_point
+    half = step / 2
+    labels = map(str, range(1, len(grid_x) * len(grid_y) + 1))
+    cells = itertools.product(grid_x.tolist(), grid_y.tolist())
+
+    for label, (x, y) in zip(labels, cells):
+        add_text(label, height=0.25, dxfattribs=text_attrs).set_placement(
+            (x + half, y + half), align=TextEntityAlignment.CENTER
+        )
+
+    for point in icoords.tolist():
+        add_point(point, dxfattribs=point_attrs)
+
+
+def save_dxf(doc, filename):
+    zoom.extents(doc.modelspace())
+    doc.saveas(filename)
+
+
+def save_csv(squares, filename):
+    fmt = "%i;%10.4f;%10.4f;%10.4f;%10.4f\n"
+    cols = [squares[:, 0].astype(np.int64).tolist()]
+    cols += [squares[:, k].tolist() for k in range(1, 5)]
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write("".join(fmt % row for row in zip(*cols)))
+
+
+def save_npz(squares, icoords, filename, layer=0, typ="CIRCLE"):
+    """Save the grid so that later runs can plot it without the DXF.
+
+    x and y stay float64, float32 is too coarse for projected coordinates.
+    layer and typ record which entities the grid was built from.
+    """
+    np.savez_compressed(
+        filename,
+        x=icoords[:, 0],
+        y=icoords[:, 1],
+        z=icoords[:, 2].astype(np.float32),
+        squares=squares,
+        layer=str(layer),
+        typ=str(typ),
+    )
+
+
+def load_npz(filename, source, layer=0, typ="CIRCLE"):
+    """Return icoords saved by save_npz, or None if the cache does not apply.
+
+    The cache is ignored if it is missing, older than source or was built
+    from a different layer or entity type.
+    """
+    if not os.path.exists(filename):
+        return None
+    if os.path.getmtime(filename) < os.path.getmtime(source):
+        return None
+    with np.load(filename) as f:
+        if "layer" not in f or "typ" not in f:
+            return None
+        if str(f["layer"]) != str(layer) or str(f["typ"]) != str(typ):
+            return None
+        return np.stack([f["x"], f["y"], f["z"]], axis=1)
+
+
+def plot(icoords, filename=None, max_points=None):
+    """Plot the interpolated surface; matplotlib is imported on first use.
+
+    If filename is given the figure is rendered with the Agg backend and
+    saved there instead of being shown. Clouds larger than max_points are
+    plotted from a random subset of that size.
+    """
+    import matplotlib
+
+    if filename is not None:
+        matplotlib.use("Agg")
+
+    import matplotlib.pyplot as plt
+    from matplotlib import cm
+
+    if max_points is not None and len(icoords) > max_points:
+        rng = np.random.default_rng(0)
+        icoords = icoords[rng.choice(len(icoords), max_points, replace=False)]
+
+    x = icoords[:, 0]
+    y = icoords[:, 1]
+    z = icoords[:, 2]
+
+    fig = plt.figure()
+    ax = fig.add_subplot(projection="3d")
+    ax.plot_trisurf(x, y, z, cmap=cm.terrain)
+    if filename is not None:
+        fig.savefig(filename, dpi=100)
+    else:
+        plt.show()
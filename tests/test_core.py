@@ -0,0 +1,154 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from scipy.interpolate import griddata
+
+from surf_grid import core
+
+
+def lattice(nx, ny, spacing, origin=(1000.0, 500.0), hole=None):
+    i, j = np.meshgrid(np.arange(nx), np.arange(ny), indexing="ij")
+    keep = np.ones(i.shape, dtype=bool)
+    if hole is not None:
+        keep[hole] = False
+    i, j = i[keep], j[keep]
+    x = origin[0] + i * spacing
+    y = origin[1] + j * spacing
+    z = 10 + np.sin(i / 5) + np.cos(j / 7)
+    return np.column_stack([x, y, z])
+
+
+def griddata_reference(coords, step=core.STEP):
+    grid_x, grid_y, _ = core.interpolate(coords, step)
+    Z = griddata(
+        coords[:, :2],
+        coords[:, 2],
+        (grid_x[:, None], grid_y[None, :]),
+        method="linear",
+    )
+    return Z
+
+
+@pytest.mark.parametrize(
+    "coords",
+    [
+        lattice(20, 15, 2),
+        lattice(10, 10, 4),
+        lattice(10, 10, 6),
+        lattice(20, 15, 2, hole=(10, 7)),
+    ],
+    ids=["full", "coarse-4", "coarse-6", "hole"],
+)
+def test_interpolate_matches_griddata(coords):
+    _, _, Z = core.interpolate(coords)
+    expected = griddata_reference(coords)
+    np.testing.assert_array_equal(np.isnan(Z), np.isnan(expected))
+    np.testing.assert_allclose(Z, expected, rtol=1e-6, equal_nan=True)
+
+
+def test_scatter_to_grid_returns_node_values():
+    coords = lattice(20, 15, 2)
+    ij = core._snap_to_grid(coords[:, :2], (1000.0, 500.0), 2)
+    Z = core._scatter_to_grid(ij, coords[:, 2], 19, 14)
+    np.testing.assert_array_equal(Z, coords[:, 2].reshape(20, 15)[:19, :14])
+
+
+def test_interpolate_jittered_lattice():
+    coords = lattice(20, 15, 2)
+    jittered = coords.copy()
+    rng = np.random.default_rng(1)
+    jittered[:, :2] += rng.uniform(-1e-4, 1e-4, size=(len(coords), 2))
+    jittered[0, :2] = coords[0, :2]
+    _, _, Z = core.interpolate(jittered)
+    np.testing.assert_allclose(Z, griddata_reference(coords), rtol=1e-6)
+
+
+def test_snap_to_grid_full_lattice():
+    coords = lattice(20, 15, 2)
+    assert core._snap_to_grid(coords[:, :2], (1000.0, 500.0), 2) is not None
+
+
+@pytest.mark.parametrize(
+    "coords",
+    [lattice(10, 10, 4), lattice(20, 15, 2, hole=(10, 7))],
+    ids=["coarse", "hole"],
+)
+def test_snap_to_grid_incomplete_lattice(coords):
+    assert core._snap_to_grid(coords[:, :2], (1000.0, 500.0), 2) is None
+
+
+def test_snap_to_grid_scattered():
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0, 100, size=(50, 2))
+    assert core._snap_to_grid(points, points.min(axis=0), 2) is None
+
+
+def test_npz_cache_roundtrip(tmp_path):
+    source = tmp_path / "drawing.dxf"
+    source.write_text("")
+    filename = tmp_path / "drawing_output.npz"
+    coords = lattice(20, 15, 2)
+    squares, icoords = core.build_grid(*core.interpolate(coords))
+    core.save_npz(squares, icoords, filename, layer=0, typ="CIRCLE")
+    np.testing.assert_allclose(
+        core.load_npz(filename, source, layer="0", typ="CIRCLE"), icoords, rtol=1e-6
+    )
+    assert core.load_npz(filename, source, layer="1", typ="CIRCLE") is None
+    assert core.load_npz(filename, source, layer="0", typ="POINT") is None
+
+
+def test_npz_cache_missing(tmp_path):
+    source = tmp_path / "drawing.dxf"
+    source.write_text("")
+    assert core.load_npz(tmp_path / "drawing_output.npz", source) is None
+
+
+def test_build_squares_and_mask_numba_matches_numpy(monkeypatch):
+    pytest.importorskip("numba")
+    _, _, Z = core.interpolate(lattice(20, 15, 2, hole=(10, 7)))
+    Z[3, 4] = np.nan
+    expected = core._build_squares_and_mask(Z)
+    monkeypatch.setattr(core, "NUMBA_MIN_SIZE", 0)
+    result = core._build_squares_and_mask(Z)
+    for a, b in zip(result, expected):
+        np.testing.assert_array_equal(a, b)
+
+
+@pytest.mark.parametrize("value", ["-1", "0", "2", "x"])
+def test_max_points_rejects_invalid_values(value):
+    main = Path(__file__).resolve().parent.parent / "main.py"
+    result = subprocess.run(
+        [sys.executable, str(main), "missing.dxf", "--max-points", value],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 2
+    assert "--max-points" in result.stderr
+
+
+def test_save_csv_matches_savetxt(tmp_path):
+    rng = np.random.default_rng(2)
+    squares = rng.uniform(-100, 1000, size=(50, 5))
+    squares[:, 0] = np.arange(1, 51)
+    squares[::3, 1] = np.nan
+    squares[5, 1:] = np.nan
+    squares[7, 4] = 12345.678949
+    core.save_csv(squares, tmp_path / "a.csv")
+    np.savetxt(
+        tmp_path / "b.csv",
+        squares,
+        delimiter=";",
+        fmt=["%i", "%10.4f", "%10.4f", "%10.4f", "%10.4f"],
+        encoding="utf-8",
+    )
+    assert (tmp_path / "a.csv").read_bytes() == (tmp_path / "b.csv").read_bytes()
+
+
+def test_readfile_rejects_non_dxf(tmp_path):
+    filename = tmp_path / "drawing.dxf"
+    filename.write_text("not a drawing\n")
+    with pytest.raises(IOError, match="is not a DXF file"):
+        core.readfile(str(filename))